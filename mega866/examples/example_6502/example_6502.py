@@ -1,4 +1,4 @@
-from gpio_controller import GpioController, all_earth_pins
+from gpio_controller import GpioController, all_earth_pins, pin, pins
 from time import sleep
 from intelhex import IntelHex
 import sys
@@ -144,38 +144,26 @@ def run():
 
 
 
-def pin(x):
-    return 1 << (x - 1)
-
-
-def pins(*pin_list):
-    res = 0
-    for p in pin_list:
-        res |= pin(p)
-    return res
-
-
 def get_address_pins(input_pins):
     addr = 0
-    for k, v in address_pins.items():
-        if input_pins & (1 << (k - 1)):
-            addr |= 1 << v
+    for shift, table in address_byte_tables:
+        addr |= table[(input_pins >> shift) & 0xFF]
     return addr
 
 
 def get_data_pins(input_pins):
     addr = 0
-    for k, v in data_pins.items():
-        if input_pins & (1 << (k - 1)):
-            addr |= 1 << v
+    for shift, table in data_byte_tables:
+        addr |= table[(input_pins >> shift) & 0xFF]
     return addr
 
 
-def get_rw_pin(input_pins):
-    if (input_pins & pin(RW_PIN)) > 0:
-        return 1
-    else:
-        return 0
+def decode_bus(input_pins):
+    # One pass over the GPIO word: decoded address plus the r/w flag.
+    addr = 0
+    for shift, table in address_byte_tables:
+        addr |= table[(input_pins >> shift) & 0xFF]
+    return addr, 1 if input_pins & RW_MASK else 0
 
 # NOTE: pin 45 needs to be conencted to ground manually using a jumper wire or the like.
 
@@ -184,6 +172,14 @@ c = GpioController(
     earth_serial_device="/dev/serial/by-id/usb-ProgHQ_Open-TL866_Programmer_33144A91666856D18E6084EC-if00"
 )
 
+# The controller methods the per-cycle code calls, hoisted to module level
+# once so the hot loop skips the c.<attr> lookup on every call.
+io_r = c.io_r
+io_w = c.io_w
+io_w_batch = c.io_w_batch
+io_w_pulse = c.io_w_pulse
+io_tri = c.io_tri
+
 tristate_pins = set(all_earth_pins)
 
 # The letter 'B' at the end of a pin name means "bar", i.e., negated, active low
@@ -192,6 +188,11 @@ CLOCK_PIN = 59
 RW_PIN = 65
 RESET_PIN = 49
 
+# Already-shifted masks for the per-cycle bit tests, so the hot loop doesn't
+# call pin() just to redo a constant shift.
+RW_MASK = pin(RW_PIN)
+CLOCK_MASK = pin(CLOCK_PIN)
+
 # Control pins
 tristate_pins.remove(
     3
@@ -215,26 +216,41 @@ tristate_pins.remove(
 
 # Data pins
 data_pins = {11: 0, 13: 1, 15: 2, 17: 3, 19: 4, 21: 5, 77: 6, 79: 7}
-data_pins_rev = {}
-for k, v in data_pins.items():
-    data_pins_rev[v] = k
+
+# Precomputed (gpio mask, value bit) pairs so the per-cycle decode loops don't
+# iterate the dict and redo the shifts on every bus cycle. data_mask_map is
+# the reverse direction: value bit -> gpio mask.
+data_bit_map = tuple((1 << (k - 1), 1 << v) for k, v in data_pins.items())
+data_mask_map = tuple((1 << v, 1 << (k - 1)) for k, v in data_pins.items())
+
+# The two tristate configurations the bus loop flips between, as masks built
+# once instead of mutating the set and re-splatting it on every cycle.
+TRI_ALL_MASK = pins(*(tristate_pins | set(data_pins.keys())))
+TRI_NODATA_MASK = pins(*(tristate_pins - set(data_pins.keys())))
+
+# Whether the data pins are currently driven. Tracked so consecutive cycles
+# that want the same tristate state (e.g. back-to-back write cycles) skip the
+# redundant io_tri round trip.
+data_pins_driven = False
 
 def set_data_pins_high_z():
-    global tristate_pins
-    tristate_pins |= set(data_pins.keys())
-    c.io_tri(pins(*tristate_pins))
+    global data_pins_driven
+    if data_pins_driven:
+        io_tri(TRI_ALL_MASK)
+        data_pins_driven = False
 
 def set_data_pins_rw():
-    global tristate_pins
-    tristate_pins -= set(data_pins.keys())
-    c.io_tri(pins(*tristate_pins))
-
-def get_data_pins_from_byte(b):
-    pins = []
-    for i in range(0, 8):
-        if (1 << i) & b:
-            pins.append(data_pins_rev[i])
-    return pins
+    global data_pins_driven
+    if not data_pins_driven:
+        io_tri(TRI_NODATA_MASK)
+        data_pins_driven = True
+
+def data_num_to_mask(b):
+    mask = 0
+    for bit, gpio_mask in data_mask_map:
+        if b & bit:
+            mask |= gpio_mask
+    return mask
 
 set_data_pins_high_z()
 
@@ -258,12 +274,90 @@ address_pins = {
     29: 15,
 }
 
-memory = {}
+address_bit_map = tuple((1 << (k - 1), 1 << v) for k, v in address_pins.items())
+
+
+# Byte-granularity gather tables: for each byte of the 160-bit GPIO word that
+# holds any pins of interest, a 256-entry table mapping that byte's value to
+# the decoded bits it contributes. Decode is then one table index per byte
+# instead of one bit test per pin (a software PEXT).
+MEGA866_BYTES = 20  # 160 pins / 8
+
+
+def _make_byte_tables(bit_map):
+    tables = []
+    for byte_index in range(MEGA866_BYTES):
+        shift = 8 * byte_index
+        relevant = [(mask >> shift, bit) for mask, bit in bit_map if (mask >> shift) & 0xFF]
+        if not relevant:
+            continue
+        table = [0] * 256
+        for v in range(256):
+            out = 0
+            for byte_mask, bit in relevant:
+                if v & byte_mask:
+                    out |= bit
+            table[v] = out
+        tables.append((shift, tuple(table)))
+    return tuple(tables)
+
+
+address_byte_tables = _make_byte_tables(address_bit_map)
+data_byte_tables = _make_byte_tables(data_bit_map)
+
+# Optional Numba-compiled decode kernel. The mega866 GPIO word is 160 bits
+# wide, which doesn't fit a machine integer, so the masks are split into two
+# 64-bit halves for the kernel (all the 6502's bus pins sit below bit 128).
+# Without numba installed the pure-Python loops above are used instead.
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    pass
+else:
+    _MASK64 = (1 << 64) - 1
+
+    def _make_lut(bit_map):
+        # Three parallel contiguous arrays (structure-of-arrays) rather than
+        # one 2-D row-per-pin table, so the kernel walks each column with
+        # unit stride.
+        masks_lo = np.array([mask & _MASK64 for mask, _ in bit_map], dtype=np.uint64)
+        masks_hi = np.array([(mask >> 64) & _MASK64 for mask, _ in bit_map], dtype=np.uint64)
+        out_bits = np.array([bit for _, bit in bit_map], dtype=np.uint64)
+        return masks_lo, masks_hi, out_bits
+
+    address_lut = _make_lut(address_bit_map)
+    data_lut = _make_lut(data_bit_map)
+
+    @njit(cache=True)
+    def _decode(lo, hi, masks_lo, masks_hi, out_bits):
+        res = 0
+        for i in range(masks_lo.shape[0]):
+            if (lo & masks_lo[i]) | (hi & masks_hi[i]):
+                res |= out_bits[i]
+        return res
+
+    def get_address_pins(input_pins):
+        return int(_decode(input_pins & _MASK64, (input_pins >> 64) & _MASK64, *address_lut))
+
+    def get_data_pins(input_pins):
+        return int(_decode(input_pins & _MASK64, (input_pins >> 64) & _MASK64, *data_lut))
+
+    def decode_bus(input_pins):
+        addr = int(_decode(input_pins & _MASK64, (input_pins >> 64) & _MASK64, *address_lut))
+        return addr, 1 if input_pins & RW_MASK else 0
+
+# The whole 64 KiB 6502 address space as a flat bytearray: indexed access
+# with no hashing, and unprogrammed locations read as 0 like the old
+# dict.get(addr, 0) did.
+memory = bytearray(0x10000)
 
 ih = IntelHex(os.path.join(os.path.realpath(os.path.dirname(__file__)), 'prog_6502.hex'))
 
-for addr in ih.addresses():
-    memory[addr] = ih[addr]
+# Copy each contiguous segment in one slice assignment rather than one
+# Python-level store per address.
+for seg_start, seg_stop in ih.segments():
+    memory[seg_start:seg_stop] = ih.tobinstr(start=seg_start, end=seg_stop - 1)
 
 OUT_PORT = 0x6000
 WRITE = 0
@@ -278,12 +372,15 @@ def handle_write(address, data):
         memory[address] = data
 
 def handle_read(address):
-    return memory.get(address, 0)
+    return memory[address]
 
 c.init()
-c.io_tri(pins(*tristate_pins))
+c.io_tri(TRI_ALL_MASK)
 
 always_high_pins = pins(3, 7, 49, 55, 57, 61)
+# Combined with the clock bit once here rather than ORing pin(CLOCK_PIN) back
+# in on every half-cycle.
+always_high_clk = always_high_pins | pin(CLOCK_PIN)
 
 c.vdd_volt(1)  # 3.5V
 c.vdd_pins(pins(67))  # VDD
@@ -291,37 +388,40 @@ c.vdd_en()
 
 c.io_w(0)  # This should reset the 6502
 sleep(0.001)
-# First rising edge starts reset sequence
-c.io_w(always_high_pins | pin(CLOCK_PIN))
-sleep(0.001)
-c.io_w(always_high_pins)
+# First rising edge starts the reset sequence. The pulse goes out as one
+# burst; the serial round trip between the frames is already far longer than
+# the hold time the 6502 needs.
+io_w_batch([always_high_clk, always_high_pins])
 
 def clock_cycle():
     set_data_pins_high_z()
     sleep(0.0000003)
-    input_pins = c.io_r()
-    address = get_address_pins(input_pins)
-    rw = get_rw_pin(input_pins)
+    input_pins = io_r()
+    address, rw = decode_bus(input_pins)
     data = 0
     if rw == READ:
         set_data_pins_rw()
         data = handle_read(address)
-        c.io_w(always_high_pins | pins(*get_data_pins_from_byte(data)) | pin(CLOCK_PIN))
-        sleep(0.0000003)
-        c.io_w(always_high_pins | pins(*get_data_pins_from_byte(data)))
+        data_mask = data_num_to_mask(data)
+        # The serial round trip per write already dwarfs the 300ns hold time,
+        # so the whole clock pulse can go out as one burst.
+        io_w_pulse(always_high_pins | data_mask, CLOCK_MASK)
     else:
-        c.io_w(always_high_pins | pin(CLOCK_PIN))
+        io_w(always_high_clk)
         sleep(0.0000003)
-        input_pins = c.io_r()
+        input_pins = io_r()
         data = get_data_pins(input_pins)
         handle_write(address, data)
-        c.io_w(always_high_pins)
+        io_w(always_high_pins)
         sleep(0.0000003)
 
-    return f"{address:#06x} {data:#04x} {'r' if rw == 1 else 'w'}\n"
+    return address, data, rw
 
 def clock_cycle_and_display():
-    bus_str = clock_cycle()
+    # Formatting lives here, at the display site, so clock_cycle itself does
+    # no string work.
+    address, data, rw = clock_cycle()
+    bus_str = f"{address:#06x} {data:#04x} {'r' if rw == 1 else 'w'}\n"
     bus_activity_buffer.set_document(
     bus_activity_buffer.document.insert_after(bus_str), bypass_readonly=True)
     bus_activity_buffer.auto_down()
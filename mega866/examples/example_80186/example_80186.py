@@ -1,19 +1,9 @@
-from gpio_controller import GpioController, all_pins
+from gpio_controller import GpioController, all_pins, pin, pins
 from time import sleep
 
 # We are using the PGA132 adapter
 # We are using the PGA68
 
-def pin(x):
-    return 1 << (x - 1)
-
-
-def pins(*pin_list):
-    res = 0
-    for p in pin_list:
-        res |= pin(p)
-    return res
-
 plccpin2socketpin = [
         33,
         31,
@@ -151,17 +141,32 @@ for p in [RES, X1, TMR_IN_0, TMR_IN_1, DRQ_0, DRQ_1, NMI, INT0, INT1, INT2, INT3
 
 always_high_pins = [TMR_IN_0, TMR_IN_1, ERROR, SRDY]
 
+# Status pin masks precomputed so display_pins doesn't rebuild the list and
+# reshift every pin on each bus cycle.
+display_pin_masks = [
+    ("DEN", pin(DEN)),
+    ("RD", pin(RD)),
+    ("WR", pin(WR)),
+    ("S0", pin(S0)),
+    ("S1", pin(S1)),
+    ("S2", pin(S2)),
+    ("LOCK", pin(LOCK)),
+]
+
 def display_pins(read_pins):
-    for p in [["DEN", DEN], ["RD", RD], ["WR", WR], ["S0", S0], ["S1", S1], ["S2", S2], ["LOCK", LOCK]]:
-        name = p[0]
-        bit = 1 if (pin(p[1]) & read_pins) > 0 else 0
+    for name, mask in display_pin_masks:
+        bit = 1 if (mask & read_pins) > 0 else 0
         print(f"{name:<10}: {bit}")
 
 def do_bus_cycles(controller):
+    # Build the two masks once instead of re-splatting always_high_pins on
+    # every half-cycle.
+    high = pins(*always_high_pins)
+    high_clk = high | pin(X1)
     for _ in range(10):
-        controller.io_w(pins(*always_high_pins))
+        controller.io_w(high)
         sleep(0.001)
-        controller.io_w(pins(*always_high_pins) | pin(X1))
+        controller.io_w(high_clk)
         sleep(0.001)
         display_pins(controller.io_r())
 
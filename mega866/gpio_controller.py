@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Dict, Iterator, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence
 from otl866.bitbang import Bitbang  # type: ignore
 
 TL866_LOWEST_PIN_NUMBER: int = 1
@@ -11,6 +12,17 @@ MEGA866_HIGHEST_PIN_NUMBER: int = 160
 MEGA866_LOWEST_PIN_NUMBER: int = 1
 
 
+def pin(x: int) -> int:
+    return 1 << (x - 1)
+
+
+def pins(*pin_list: int) -> int:
+    res = 0
+    for p in pin_list:
+        res |= pin(p)
+    return res
+
+
 class Tl866Instance(Enum):
     WATER = 1  # J9
     EARTH = 2  # J3
@@ -262,24 +274,76 @@ class GpioController:
         add_device(self, fire_serial_device, Tl866Instance.FIRE)
         add_device(self, wind_serial_device, Tl866Instance.WIND)
 
+        # Flat (mega mask, tl866 mask) translation tables per controller,
+        # built once so the per-call pin translation is plain integer ANDs
+        # and ORs with no dict lookups or attribute chasing.
+        self._translation = []
+        driveable = 0
+        for controller in self.bitbangers:
+            pairs = tuple(
+                (1 << (mega_pin - 1), 1 << (tl866_pin.pin - 1))
+                for mega_pin, tl866_pin in pin2Tl866_map.items()
+                if tl866_pin.bitbanger is controller
+            )
+            self._translation.append((controller, pairs))
+            for mega_mask, _ in pairs:
+                driveable |= mega_mask
+        self._undriveable_mask = (
+            (1 << MEGA866_HIGHEST_PIN_NUMBER) - 1
+        ) & ~driveable
+
+        # The attached TL866s are independent serial devices, so their
+        # transfers can be in flight at the same time instead of paying one
+        # round trip after another. One worker per device; pointless with a
+        # single device.
+        self._executor = (
+            ThreadPoolExecutor(max_workers=len(self.bitbangers))
+            if len(self.bitbangers) > 1
+            else None
+        )
+
+        # The hot loops write the same handful of masks over and over (clock
+        # states, a few data patterns), so translated payloads are memoized
+        # per mask. Bounded so a pathological caller can't grow them forever.
+        self._frame_cache: Dict[int, Dict[Bitbang, int]] = {}
+        self._single_cache: Dict[int, int] = {}
+
+        # With a single attached programmer the per-controller fan-out is
+        # pure overhead, so bind specialized variants once here rather than
+        # re-checking the device count on every call.
+        if len(self.bitbangers) == 1:
+            self.io_w = self._io_w_single
+            self.io_r = self._io_r_single
+
     def __iter__(self) -> Iterator[Bitbang]:
         return iter(self.bitbangers)
 
+    _TRANSLATION_CACHE_LIMIT = 4096
+
     def _get_pins_per_controller(self, val: int) -> Dict[Bitbang, int]:
+        pins_per_tl866 = self._frame_cache.get(val)
+        if pins_per_tl866 is not None:
+            return pins_per_tl866
+        if val & self._undriveable_mask:
+            self._raise_undriveable(val & self._undriveable_mask)
         pins_per_tl866 = {}
-        for controller in self:
-            pins_per_tl866[controller] = 0
+        for controller, pairs in self._translation:
+            res = 0
+            for mega_mask, tl866_mask in pairs:
+                if val & mega_mask:
+                    res |= tl866_mask
+            pins_per_tl866[controller] = res
+        if len(self._frame_cache) < self._TRANSLATION_CACHE_LIMIT:
+            self._frame_cache[val] = pins_per_tl866
+        return pins_per_tl866
+
+    def _raise_undriveable(self, val: int) -> None:
         for i in range(0, MEGA866_HIGHEST_PIN_NUMBER):
             if val & (1 << i):
                 if (i + 1) not in pin2Tl866_map:
                     raise Exception(f"Pin {i + 1} is not valid")
                 elif pin2Tl866_map[i + 1].bitbanger is None:
                     raise Exception(f"device for pin {i + 1} not given")
-                else:
-                    pins_per_tl866[pin2Tl866_map[i + 1].bitbanger] |= (
-                        1 << pin2Tl866_map[i + 1].pin - 1
-                    )
-        return pins_per_tl866
 
     def vdd_en(self, enable: bool = True) -> None:
         for controller in self:
@@ -309,9 +373,22 @@ class GpioController:
         for controller, val in self._get_pins_per_controller(val).items():
             controller.gnd_pins(val)
 
+    def _run_per_controller(
+        self, method_name: str, pins_per_tl866: Dict[Bitbang, int]
+    ) -> None:
+        if self._executor is None:
+            for controller, val in pins_per_tl866.items():
+                getattr(controller, method_name)(val)
+        else:
+            futures = [
+                self._executor.submit(getattr(controller, method_name), val)
+                for controller, val in pins_per_tl866.items()
+            ]
+            for future in futures:
+                future.result()
+
     def io_tri(self, val: int = int("ff" * 5 * 4, base=16)):
-        for controller, val in self._get_pins_per_controller(val).items():
-            controller.io_tri(val)
+        self._run_per_controller("io_tri", self._get_pins_per_controller(val))
 
     def io_trir(self, val: int = int("ff" * 5 * 4, base=16)) -> int:
         res = 0
@@ -323,18 +400,60 @@ class GpioController:
         return res
 
     def io_w(self, val: int) -> None:
-        for controller, val in self._get_pins_per_controller(val).items():
-            controller.io_w(val)
+        self._run_per_controller("io_w", self._get_pins_per_controller(val))
+
+    def _io_w_single(self, val: int) -> None:
+        res = self._single_cache.get(val)
+        if res is None:
+            if val & self._undriveable_mask:
+                self._raise_undriveable(val & self._undriveable_mask)
+            res = 0
+            for mega_mask, tl866_mask in self._translation[0][1]:
+                if val & mega_mask:
+                    res |= tl866_mask
+            if len(self._single_cache) < self._TRANSLATION_CACHE_LIMIT:
+                self._single_cache[val] = res
+        self._translation[0][0].io_w(res)
+
+    def io_w_batch(self, vals: Sequence[int]) -> None:
+        # Write a burst of GPIO states back-to-back. The mega-pin to
+        # TL866-pin translation for every frame is done up front so the
+        # writes go out with no translation work between them.
+        frames = [self._get_pins_per_controller(val) for val in vals]
+        for frame in frames:
+            self._run_per_controller("io_w", frame)
+
+    def io_w_pulse(self, base: int, pulse: int) -> None:
+        # Drive base|pulse then base as one burst: a full clock pulse with no
+        # translation work between the two edges.
+        self.io_w_batch([base | pulse, base])
 
     def io_r(self, val: int = int("ff" * 5 * 4, base=16)) -> int:
+        # Kick off all the reads at once so the serial round trips overlap,
+        # then merge the results.
+        if self._executor is None:
+            raw = [controller.io_r() for controller in self]
+        else:
+            raw = list(
+                self._executor.map(lambda controller: controller.io_r(), self)
+            )
         res = 0
-        for controller in self:
-            pins = controller.io_r()
+        for controller, pins in zip(self, raw):
             for i in range(0, TL866_HIGHEST_PIN_NUMBER):
                 if pins & (1 << i):
                     res |= 1 << (controller.Tl866Pin2megaPin[i + 1] - 1)
         return res
 
+    def _io_r_single(self, val: int = int("ff" * 5 * 4, base=16)) -> int:
+        controller = self.bitbangers[0]
+        pins = controller.io_r()
+        tl866_pin2mega_pin = controller.Tl866Pin2megaPin
+        res = 0
+        for i in range(0, TL866_HIGHEST_PIN_NUMBER):
+            if pins & (1 << i):
+                res |= 1 << (tl866_pin2mega_pin[i + 1] - 1)
+        return res
+
     def init(self) -> None:
         for controller in self:
             controller.init()